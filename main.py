@@ -1,5 +1,6 @@
 import sys
 import cv2
+import numpy as np
 import os
 import time
 from datetime import datetime
@@ -35,6 +36,11 @@ class MainWindow(QMainWindow):
         self.video_position = 0
         self.is_slider_pressed = False
         
+        # Camera preview size last sent to the capture thread
+        self._camera_display_size = None
+        # Video label size last sent to the player thread
+        self._video_display_size = None
+        
          # Fullscreen player window
         self.fullscreen_player = None
         self.is_in_fullscreen_mode = False
@@ -49,6 +55,9 @@ class MainWindow(QMainWindow):
         self.video_player_thread.frame_ready.connect(self.update_video_frame)
         self.video_player_thread.playback_finished.connect(self.on_playback_finished)
         self.video_player_thread.video_info_ready.connect(self.update_video_info)
+        self.video_player_thread.load_finished.connect(self.on_video_load_finished)
+        # (file path, auto play) of the load the player thread is working on
+        self._pending_video_load = None
 
         # Setup styles
         self.setup_styles()
@@ -605,6 +614,7 @@ class MainWindow(QMainWindow):
                 self.video_player_thread.frame_ready.disconnect(self.update_video_frame)
                 self.video_player_thread.playback_finished.disconnect(self.on_playback_finished)
                 self.video_player_thread.video_info_ready.disconnect(self.update_video_info)
+                self.video_player_thread.load_finished.disconnect(self.on_video_load_finished)
             except TypeError:
                 # Signals may not be connected, which is fine
                 pass
@@ -612,11 +622,13 @@ class MainWindow(QMainWindow):
             # Delete old thread and create a new one
             old_thread = self.video_player_thread
             self.video_player_thread = VideoPlayerThread()
+            self._video_display_size = None  # Resend the label size to the new thread
             
             # Connect new thread signals
             self.video_player_thread.frame_ready.connect(self.update_video_frame)
             self.video_player_thread.playback_finished.connect(self.on_playback_finished)
             self.video_player_thread.video_info_ready.connect(self.update_video_info)
+            self.video_player_thread.load_finished.connect(self.on_video_load_finished)
             
             # Shutdown and clean up old thread
             old_thread.shutdown()
@@ -624,18 +636,30 @@ class MainWindow(QMainWindow):
                 old_thread.quit()
                 old_thread.wait(3000)  # Wait up to 3 seconds for thread to finish
             
-            if self.video_player_thread.load_video(file_path):
-                self.video_player_thread.start()  # Start the new thread
+            # Open the file on the player thread; on_video_load_finished completes the load
+            self.start_video_load(file_path, auto_play=False)
+                
+    def start_video_load(self, file_path, auto_play):
+        """Ask the player thread to open a video without blocking the UI"""
+        self.video_loaded = False
+        self._pending_video_load = (file_path, auto_play)
+        self.video_status.setText("Loading")
+        self.video_status.setStyleSheet("background-color: #f9e2af; color: #000000;")
+        self.video_player_thread.start()  # Start the new thread
+        self.video_player_thread.load_video_async(file_path)
+        
+    def on_video_load_finished(self, loaded):
+        """Finish a video load started by start_video_load"""
+        if self._pending_video_load is None:
+            return
+        file_path, auto_play = self._pending_video_load
+        self._pending_video_load = None
+        
+        if not auto_play:
+            if loaded:
                 self.video_loaded = True
                 self.video_status.setText("Loaded")
                 self.video_status.setStyleSheet("background-color: #a6e3a1; color: #000000;")
-                # Display first frame
-                cap = cv2.VideoCapture(file_path)
-                if cap.isOpened():
-                    ret, frame = cap.read()
-                    if ret:
-                        self.display_video_frame(frame)
-                    cap.release()
                 
                 # Reset progress slider and time label to start
                 self.progress_slider.setValue(0)
@@ -646,7 +670,32 @@ class MainWindow(QMainWindow):
                 self.video_status.setText("Load Failed")
                 self.video_status.setStyleSheet("background-color: #f38ba8; color: #000000;")
                 QMessageBox.warning(self, "Failure", f"Cannot load video: {os.path.basename(file_path)}")
-                
+            return
+        
+        # Auto play: start the next video as soon as it is open
+        if loaded:
+            next_video = os.path.basename(file_path)
+            self.current_video_file = file_path
+            self.video_loaded = True
+            self.video_status.setText("Auto Playing")
+            self.video_status.setStyleSheet("background-color: #89b4fa; color: #000000;")
+            
+            # Ensure the video player is in the correct state
+            self.video_player_thread.play()
+            
+            # Show message
+            self.statusBar().showMessage(f"Auto-playing next video: {next_video}")
+            
+            # If in fullscreen mode, update the fullscreen player as well
+            if self.is_in_fullscreen_mode and self.fullscreen_player:
+                self.fullscreen_player.play_pause_btn.setText("Pause")
+                self.fullscreen_player.show_status(f"Auto-playing: {next_video}")
+        else:
+            self.video_loaded = False
+            self.video_status.setText("Auto Play Failed")
+            self.video_status.setStyleSheet("background-color: #f38ba8; color: #000000;")
+            self.statusBar().showMessage("Failed to auto-play next video")
+
     def update_video_info(self, video_info):
         """Update video information display"""
         filename = video_info['filename']
@@ -714,19 +763,47 @@ class MainWindow(QMainWindow):
                 error(f"Error stopping video: {e}")
                 QMessageBox.warning(self, "Playback Error", "Failed to stop playback")
             
-    def update_camera_frame(self, frame):
-        self.display_frame(self.camera_display, frame)
+    def update_camera_frame(self, image):
+        """Show a preview image that was already scaled by the capture thread"""
+        size = self.camera_display.size()
+        if (size.width(), size.height()) != self._camera_display_size:
+            self._camera_display_size = (size.width(), size.height())
+            self.video_thread.set_display_size(*self._camera_display_size)
+        # Images produced before the capture thread saw the new size still need scaling
+        if image.width() > size.width() or image.height() > size.height():
+            image = image.scaled(size, Qt.AspectRatioMode.KeepAspectRatio,
+                                 Qt.TransformationMode.SmoothTransformation)
+        self.camera_display.setPixmap(QPixmap.fromImage(image))
         
     def update_video_frame(self, frame):
         self.display_video_frame(frame)
         
     def display_frame(self, label, frame):
         """Display frame to specified label"""
-        rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_image.shape
-        bytes_per_line = ch * w
-        qt_image = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-        pixmap = QPixmap.fromImage(qt_image)
+        # Let the decoder scale to the label instead of shipping full-resolution frames;
+        # in fullscreen play mode the hidden main label is painted too, so only the
+        # visible view sets the size
+        if self.fullscreen_player and self.fullscreen_player.isVisible():
+            active_label = self.fullscreen_player.video_label
+        else:
+            active_label = self.video_display
+        label_size = (label.width(), label.height())
+        if label is active_label and label_size != self._video_display_size:
+            self._video_display_size = label_size
+            self.video_player_thread.set_display_size(*label_size)
+        
+        # Wrap the BGR buffer directly instead of converting it to a new RGB array;
+        # QImage only borrows the memory, so 'frame' must stay referenced until
+        # QPixmap.fromImage has taken its own copy below
+        h, w = frame.shape[:2]
+        if frame.strides[1:] != (3, 1) or frame.strides[0] < w * 3:
+            frame = frame.copy()
+        # Row padding (as PyAV leaves on odd widths) is passed as bytesPerLine over a
+        # flat byte view, so padded decoder output is not repacked first
+        span = np.lib.stride_tricks.as_strided(
+            frame, shape=((h - 1) * frame.strides[0] + w * 3,), strides=(1,))
+        qt_image = QImage(span.data, w, h, frame.strides[0], QImage.Format.Format_BGR888)
+        pixmap = QPixmap.fromImage(qt_image, Qt.ImageConversionFlag.NoFormatConversion)
         
         scaled_pixmap = pixmap.scaled(
             label.size(), 
@@ -790,10 +867,11 @@ class MainWindow(QMainWindow):
         
     def on_progress_slider_moved(self, value):
         """Progress slider moved event"""
-        if self.video_loaded and not self.is_slider_pressed:
+        if self.video_loaded:
             position = value / 1000.0
             target_frame = int(position * self.video_player_thread.total_frames)
-            self.video_player_thread.seek(target_frame)  # Send signal, handled by playback thread
+            # While dragging, only land on keyframes; the release does the exact seek
+            self.video_player_thread.seek(target_frame, exact=not self.is_slider_pressed)  # Handled by playback thread
             
     def on_progress_slider_pressed(self):
         """Progress slider pressed event"""
@@ -877,6 +955,7 @@ class MainWindow(QMainWindow):
                     self.video_player_thread.frame_ready.disconnect(self.update_video_frame)
                     self.video_player_thread.playback_finished.disconnect(self.on_playback_finished)
                     self.video_player_thread.video_info_ready.disconnect(self.update_video_info)
+                    self.video_player_thread.load_finished.disconnect(self.on_video_load_finished)
                 except TypeError:
                     # Signals may not be connected, which is fine
                     pass
@@ -884,11 +963,13 @@ class MainWindow(QMainWindow):
                 # Delete old thread and create a new one
                 old_thread = self.video_player_thread
                 self.video_player_thread = VideoPlayerThread()
+                self._video_display_size = None  # Resend the label size to the new thread
                 
                 # Connect new thread signals
                 self.video_player_thread.frame_ready.connect(self.update_video_frame)
                 self.video_player_thread.playback_finished.connect(self.on_playback_finished)
                 self.video_player_thread.video_info_ready.connect(self.update_video_info)
+                self.video_player_thread.load_finished.connect(self.on_video_load_finished)
                 
                 # Shutdown and clean up old thread
                 old_thread.shutdown()
@@ -896,29 +977,8 @@ class MainWindow(QMainWindow):
                     old_thread.quit()
                     old_thread.wait(3000)  # Wait up to 3 seconds for thread to finish
             
-            # Load and play the next video
-            if self.video_player_thread.load_video(next_video_path):
-                self.video_player_thread.start()  # Start the new thread
-                self.current_video_file = next_video_path
-                self.video_loaded = True
-                self.video_status.setText("Auto Playing")
-                self.video_status.setStyleSheet("background-color: #89b4fa; color: #000000;")
-                
-                # Ensure the video player is in the correct state
-                self.video_player_thread.play()
-                
-                # Show message
-                self.statusBar().showMessage(f"Auto-playing next video: {next_video}")
-                
-                # If in fullscreen mode, update the fullscreen player as well
-                if self.is_in_fullscreen_mode and self.fullscreen_player:
-                    self.fullscreen_player.play_pause_btn.setText("Pause")
-                    self.fullscreen_player.show_status(f"Auto-playing: {next_video}")
-            else:
-                self.video_loaded = False
-                self.video_status.setText("Auto Play Failed")
-                self.video_status.setStyleSheet("background-color: #f38ba8; color: #000000;")
-                self.statusBar().showMessage("Failed to auto-play next video")
+            # Load the next video on the player thread; playback starts once it is open
+            self.start_video_load(next_video_path, auto_play=True)
                 
         except Exception as e:
             error(f" Error finding next video: {e}")
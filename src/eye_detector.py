@@ -34,6 +34,9 @@ class MediaPipeEyeDetector:
         # Blink detection parameters
         self.BLINK_FRAME_THRESHOLD = 4  # Blink duration threshold (in frames)
         
+        # Wider frames are downscaled to this width before MediaPipe sees them
+        self.DETECTION_WIDTH = 320
+        
         # Data cache
         self.face_position_history = deque(maxlen=25)
         self.left_ear_history = deque(maxlen=40)
@@ -57,6 +60,10 @@ class MediaPipeEyeDetector:
         self.start_time = time.time()
         self.fps = 0
         self._closed = False  # Track whether resources have been released
+        
+        # Reused resize and colour conversion targets for the MediaPipe input
+        self._small_frame = None
+        self._rgb_frame = None
     
     
     def close(self):
@@ -171,7 +178,22 @@ class MediaPipeEyeDetector:
     
     def detect_eyes_state(self, frame):
         """Detect eye state using MediaPipe"""
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        # Landmarks come back normalized, so the mesh can run on a smaller copy while pixel
+        # coordinates (and the pixel-based thresholds) below still use the full frame size
+        mesh_input = frame
+        h, w = frame.shape[:2]
+        if w > self.DETECTION_WIDTH:
+            small_size = (self.DETECTION_WIDTH, round(h * self.DETECTION_WIDTH / w))
+            if self._small_frame is None or self._small_frame.shape[1::-1] != small_size:
+                self._small_frame = np.empty((small_size[1], small_size[0], 3), np.uint8)
+            mesh_input = cv2.resize(frame, small_size, dst=self._small_frame, interpolation=cv2.INTER_AREA)
+        # process() is synchronous, so the RGB buffer is free to overwrite on the next call
+        if self._rgb_frame is None or self._rgb_frame.shape != mesh_input.shape:
+            self._rgb_frame = np.empty(mesh_input.shape, np.uint8)
+        self._rgb_frame.flags.writeable = True
+        rgb_frame = cv2.cvtColor(mesh_input, cv2.COLOR_BGR2RGB, dst=self._rgb_frame)
+        # A read-only input lets MediaPipe wrap the buffer instead of copying it per call
+        rgb_frame.flags.writeable = False
         
         # Calculate FPS
         self.frame_count += 1
@@ -224,7 +246,6 @@ class MediaPipeEyeDetector:
         face_landmarks = results.multi_face_landmarks[0]
         
         # Extract eye landmark coordinates
-        h, w = frame.shape[:2]
         left_eye_points = []
         right_eye_points = []
         nose_points = []
@@ -1,13 +1,20 @@
 import cv2
 import time
 import threading
-from PySide6.QtCore import QThread, Signal
+from concurrent.futures import ThreadPoolExecutor
+from PySide6.QtCore import Qt, QThread, Signal
+from PySide6.QtGui import QImage
 from eye_detector import MediaPipeEyeDetector
 from log import debug,error
 
+# OpenCV starts one worker per core by default; capture, detection, Qt and the player's
+# decoder threads already compete for the Pi's four cores, and the per-frame OpenCV
+# work here (colour conversion, drawing on a 640x480 frame) is too small to gain from more
+cv2.setNumThreads(2)
+
 
 class VideoCaptureThread(QThread):
-    frame_ready = Signal(object)
+    frame_ready = Signal(QImage)  # Display-ready image, already scaled to the preview size
     detection_status = Signal(dict)  # Emit detection status
     fps_updated = Signal(float)  # Emit FPS updates
     command_detected = Signal(str)
@@ -35,28 +42,53 @@ class VideoCaptureThread(QThread):
         self.last_command = None
         self.last_face_detected_time = time.time()
 
+        # A command must repeat on this many processed frames in a row before it is emitted
+        self.COMMAND_DEBOUNCE_FRAMES = 3
+        self._pending_command = None
+        self._pending_count = 0
+
+        # Preview size requested by the GUI (width, height); None means native size
+        self._display_size = None
+
+        # Only every Nth camera frame is decoded, run through detection and shown
+        self.PROCESS_EVERY_N = 2
+        self._grab_count = 0
+        # retrieve() decodes into this array instead of allocating one per frame
+        self._frame_buf = None
+
+    def _probe_camera(self, camera_id):
+        """Return camera_id if the device opens and delivers a frame, otherwise None"""
+        temp_cap = None
+        try:
+            temp_cap = cv2.VideoCapture(camera_id)
+            if temp_cap.isOpened():
+                ret, _ = temp_cap.read()
+                if ret:
+                    return camera_id
+        except Exception as e:
+            error(f"Error checking camera {camera_id}: {e}")
+        finally:
+            if temp_cap is not None:
+                try:
+                    temp_cap.release()
+                except Exception as e:
+                    error(f"Error temp_cap.release(): {e}")
+        return None
+
     def find_available_camera(self):
         """Automatically detect available camera"""
         #debug("Searching for available camera devices...")
-        # First try the default cameras (0-9)
-        for i in range(10):
-            temp_cap = None
-            try:
-                temp_cap = cv2.VideoCapture(i)
-                if temp_cap.isOpened():
-                    ret, frame = temp_cap.read()
-                    if ret:
-                        temp_cap.release()
-                        #debug(f"Found available camera at device ID: {i}")
-                        return i
-            except Exception as e:
-                error(f"Error checking camera {i}: {e}")
-            finally:
-                if temp_cap is not None:
-                    try:
-                        temp_cap.release()
-                    except:
-                        error(f"Error temp_cap.release(): {e}")
+        # Probe the default cameras (0-9) concurrently; map() keeps index order,
+        # so the lowest working device ID still wins
+        executor = ThreadPoolExecutor(max_workers=4)
+        try:
+            for camera_id in executor.map(self._probe_camera, range(10)):
+                if camera_id is not None:
+                    #debug(f"Found available camera at device ID: {camera_id}")
+                    return camera_id
+        finally:
+            # Don't block on probes that are still pending once a camera is found
+            executor.shutdown(wait=False, cancel_futures=True)
         error("No available camera device found")
         return None
 
@@ -74,14 +106,19 @@ class VideoCaptureThread(QThread):
         with self._lock:
             self.cap = cv2.VideoCapture(camera_id)
             if self.cap.isOpened():
+                # MJPG before the size: many UVC cameras only reach 640x480@30 compressed,
+                # and skipped frames are then dropped by grab() without a JPEG decode
+                self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
                 self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
                 self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
                 self.cap.set(cv2.CAP_PROP_FPS, 30)
+                #debug(f"Camera pixel format: {int(self.cap.get(cv2.CAP_PROP_FOURCC)).to_bytes(4, 'little').decode(errors='replace')}")
                 self._closed = False
 
         with self._lock:
             self.running = True
             self.frame_count = 0
+            self._grab_count = 0
             self.fps = 0
             self.last_fps_time = time.time()
         self.start()
@@ -131,52 +168,80 @@ class VideoCaptureThread(QThread):
         with self._lock:
             self.show_landmarks = show
 
+    def set_display_size(self, width, height):
+        """Set the size preview images are scaled to before being emitted"""
+        with self._lock:
+            self._display_size = (width, height)
+
+    def _to_display_image(self, frame, display_size):
+        """Convert a BGR frame into a detached QImage scaled for the preview label"""
+        h, w = frame.shape[:2]
+        image = QImage(frame.data, w, h, frame.strides[0], QImage.Format.Format_BGR888)
+
+        scaled = image
+        if display_size is not None:
+            scaled = image.scaled(
+                display_size[0], display_size[1],
+                Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.SmoothTransformation
+            )
+        # scaled() shares the ndarray buffer when the size is unchanged, so detach
+        # before the image leaves this thread
+        if scaled.size() == image.size():
+            scaled = image.copy()
+        return scaled
+
     def run(self):
         while True:
-            # Check exit conditions
-            should_continue = False
+            # Snapshot everything the GUI thread may change in one critical section per frame
             with self._lock:
-                if (self.running and self.cap is not None and not self._closed):
-                    try:
-                        should_continue = self.cap.isOpened()
-                    except:
-                        should_continue = False
-                    
+                cap = self.cap if (self.running and not self._closed) else None
+                detecting_enabled = self.detecting
+                show_landmarks = self.show_landmarks
+                display_size = self._display_size
+                
+            # Check exit conditions
+            try:
+                should_continue = cap is not None and cap.isOpened()
+            except:
+                should_continue = False
             if not should_continue:
                 break
                 
             try:
                 ret, frame = None, None
-                cap_valid = False
-                with self._lock:
-                    cap_valid = self.cap is not None and not self._closed
-                    
-                if cap_valid:
-                    try:
-                        ret, frame = self.cap.read()
-                    except Exception as e:
-                        error(f"Error reading frame: {e}")
-                        ret = False
+                try:
+                    # grab() blocks until the next camera frame, pacing the loop, and
+                    # dequeues it without decoding; skipped frames never reach retrieve()
+                    ret = cap.grab()
+                    if ret:
+                        self._grab_count += 1
+                        if self._grab_count % self.PROCESS_EVERY_N:
+                            continue
+                        ret, frame = cap.retrieve(self._frame_buf)
+                        self._frame_buf = frame
+                except Exception as e:
+                    error(f"Error reading frame: {e}")
+                    ret = False
                         
                 if ret and frame is not None:
-                    # Calculate FPS
-                    with self._lock:
-                        self.frame_count += 1
-                        current_time = time.time()
-                        if current_time - self.last_fps_time >= 1.0:  # Update once per second
-                            self.fps = self.frame_count / (current_time - self.last_fps_time)
-                            self.frame_count = 0
-                            self.last_fps_time = current_time
+                    # Calculate FPS; each processed frame stands for PROCESS_EVERY_N grabbed
+                    # ones, so the label keeps showing the camera rate. The counters and command
+                    # state below are only touched by this thread once it runs, so they need no lock
+                    self.frame_count += self.PROCESS_EVERY_N
+                    current_time = time.time()
+                    if current_time - self.last_fps_time >= 1.0:  # Update once per second
+                        self.fps = self.frame_count / (current_time - self.last_fps_time)
+                        self.frame_count = 0
+                        self.last_fps_time = current_time
                     self.fps_updated.emit(self.fps)
 
-                    processed_frame = frame.copy()
+                    # Nothing keeps the frame past this iteration (the preview image is
+                    # detached before it is emitted), so landmarks are drawn on it in place
+                    processed_frame = frame
                     detection_result = {}
 
                     # Process frame if detection is enabled
-                    detecting_enabled = False
-                    with self._lock:
-                        detecting_enabled = self.detecting
-                        
                     if detecting_enabled:
                         try:
                             # Detect eye state
@@ -191,8 +256,7 @@ class VideoCaptureThread(QThread):
 
                             if face_detected:
                                 # Update last face detected time
-                                with self._lock:
-                                    self.last_face_detected_time = current_time
+                                self.last_face_detected_time = current_time
 
                                 # Check if eyes are closed
                                 eyes_closed = detection_result.get('eyes_closed', False)
@@ -207,26 +271,24 @@ class VideoCaptureThread(QThread):
                                     command = "play"
                             else:
                                 # Pause video if no face detected for over 1 second
-                                last_face_time = 0
-                                with self._lock:
-                                    last_face_time = self.last_face_detected_time
-                                if current_time - last_face_time > 1.0:
+                                if current_time - self.last_face_detected_time > 1.0:
                                     command = "pause"
 
                             # Draw landmarks (optional)
-                            show_landmarks = False
-                            with self._lock:
-                                show_landmarks = self.show_landmarks
-                                
                             if show_landmarks and face_detected:
                                 self.eye_detector.draw_landmarks(processed_frame, detection_result)
 
-                            # Emit command signal
-                            if command and command != self.last_command:
+                            # Emit command signal once it has held for a few frames
+                            if command == self._pending_command:
+                                self._pending_count += 1
+                            else:
+                                self._pending_command = command
+                                self._pending_count = 1
+                            if (command and command != self.last_command and
+                                    self._pending_count >= self.COMMAND_DEBOUNCE_FRAMES):
                                 #debug(f"Command detected: {command}")
                                 self.command_detected.emit(command)
-                                with self._lock:
-                                    self.last_command = command
+                                self.last_command = command
 
                         except Exception as e:
                             error(f"Detection error: {e}")
@@ -236,10 +298,8 @@ class VideoCaptureThread(QThread):
                         # If detection is disabled, emit empty status
                         self.detection_status.emit({})
 
-                    # Emit frame ready signal
-                    self.frame_ready.emit(processed_frame)
-
-                    time.sleep(0.03)  # ~30 FPS
+                    # Build and scale the preview image here to keep the GUI thread free
+                    self.frame_ready.emit(self._to_display_image(processed_frame, display_size))
                 else:
                     # If we can't read a frame, stop the capture
                     error("Cannot read frame from camera, stopping capture")
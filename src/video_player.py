@@ -1,34 +1,126 @@
 import time
 import os
 import threading
+import bisect
+import queue
+import re
+from collections import OrderedDict, deque
+from fractions import Fraction
 import subprocess
 import signal
+import shutil
 import av
-from PySide6.QtCore import QThread, Signal
+from av.codec.hwaccel import HWAccel, hwdevices_available
+from av.video.reformatter import VideoReformatter
+from PySide6.QtCore import Qt, QThread, Signal
 from log import debug, error
 
+# Playback states; a single int is read lock-free by the playback loop
+STATE_STOPPED = 0
+STATE_PLAYING = 1
+STATE_PAUSED = 2
+
+# Hardware device types tried in order for FFmpeg hwaccel decoding
+HWACCEL_DEVICE_TYPES = ('cuda', 'videotoolbox', 'd3d11va', 'vaapi', 'drm')
+# Device types that failed to open; skipped by later player threads in this process
+_failed_hwaccel_types = set()
+# Hardware decoder name suffixes tried when no hwaccel device applies (V4L2 M2M on the Pi, NVDEC on desktops)
+HW_DECODER_SUFFIXES = ('_v4l2m2m', '_cuvid')
+# Decoder names that failed to open; not probed again by later player threads
+_failed_decoders = set()
+
+
+def _reformat_threads_supported():
+    """Probe once whether this PyAV's reformat() takes the threads argument"""
+    try:
+        VideoReformatter().reformat(av.VideoFrame(16, 16, 'yuv420p'), format='bgr24', threads=0)
+        return True
+    except TypeError:
+        return False
+
+
+# Extra reformat() options: threads=0 lets swscale slice conversions across all cores;
+# empty on PyAV builds that predate the argument
+_reformat_options = {'threads': 0} if _reformat_threads_supported() else {}
+
+# Decoder forced from the environment (e.g. EYE_HWCODEC=hevc_qsv), tried first when it fits the stream
+PREFERRED_DECODER = os.environ.get('EYE_HWCODEC')
+
+# Keyframe indexes of files opened before: (path, mtime_ns, size) -> (keyframe pts, keyframe times)
+_keyframe_index_cache = {}
+
+# Audio tools are resolved once per process; main.py recreates the player for every video
+FFPLAY_PATH = shutil.which('ffplay')
+PACTL_PATH = shutil.which('pactl')
+PULSEAUDIO_PATH = shutil.which('pulseaudio')
+
+# Master clock in ffplay's status line, e.g. "  12.34 M-A:  0.000 fd=   0 ..."
+FFPLAY_CLOCK_RE = re.compile(rb'(-?\d+\.\d+) M-A:')
+# First channel volume in `pactl get-sink-volume` output
+VOLUME_RE = re.compile(r'(\d+)%')
+
+# Audio device probe result reused for a few seconds: (monotonic time, available)
+AUDIO_DEVICE_TTL = 5.0
+_audio_device_status = None
+
+# Killed audio processes are reaped by one thread shared by every player
+_reaper_queue = queue.Queue()
+_reaper_thread = None
+_reaper_lock = threading.Lock()
+
+def _reaper_loop():
+    """Wait on killed audio processes so they do not linger as zombies"""
+    while True:
+        process = _reaper_queue.get()
+        try:
+            process.wait()
+        except Exception as e:
+            error(f"Error reaping audio process: {e}")
+
+def _reap_later(process):
+    """Hand a killed process to the reaper thread so the caller never blocks on wait()"""
+    global _reaper_thread
+    with _reaper_lock:
+        if _reaper_thread is None:
+            _reaper_thread = threading.Thread(target=_reaper_loop, daemon=True)
+            _reaper_thread.start()
+    _reaper_queue.put(process)
+
 class VideoPlayerThread(QThread):
     """Stable video player thread using PyAV with proper synchronization"""
-    frame_ready = Signal(object)
+    frame_ready = Signal(object)  # Packed BGR ndarray (H, W, 3), rows may be padded; see display_frame
     playback_finished = Signal()
     video_info_ready = Signal(dict)
+    load_finished = Signal(bool)  # Result of a load_video_async request
+    _frame_posted = Signal()  # A new frame waits in _latest_frame
     
     def __init__(self):
         super().__init__()
         self.container = None
         self.video_stream = None
         self.current_file = ""
-        self.playing = False
-        self.paused = False
-        self.stopped = True
+        self._state = STATE_STOPPED
         self.video_fps = 30
+        self._fps_fraction = Fraction(30)  # Exact frame rate; video_fps is its float view
+        self._frame_interval = 1.0 / 30  # Seconds per frame, derived from video_fps on load
         self.total_frames = 0
         self.video_width = 0
         self.video_height = 0
         self.video_duration = 0
         self.exiting = False
+        self._load_request = None  # File path for run() to open on this thread
         self.current_frame = 0
-        self._lock = threading.RLock()
+        self._lock = threading.Lock()  # Not reentrant: no locked method calls another
+        # Wakes run() when play/pause/stop/seek/shutdown change the playback state
+        self._wake = threading.Event()
+        
+        # Single-frame mailbox for the GUI thread: a frame it has not picked up yet is
+        # replaced instead of queueing behind it when painting falls behind
+        self._latest_frame = None
+        self._frame_pending = False
+        self._frame_lock = threading.Lock()
+        # This object lives on the GUI thread, so the slot runs there
+        self._frame_posted.connect(self._deliver_frame, Qt.ConnectionType.QueuedConnection)
         
         # Time management
         self.play_start_time = 0  # When playback started
@@ -38,21 +130,77 @@ class VideoPlayerThread(QThread):
         
         # Frame decoding
         self.codec_context = None
+        self._hwaccel_type = None  # Device type behind self.hwaccel
+        self.hwaccel = self._make_hwaccel()
+        
+        # Size the label shows video at; frames are scaled down to it by swscale
+        self._display_size = None
+        # Reused so the swscale context survives between frames (guarded by _container_lock)
+        self._reformatter = VideoReformatter()
+        
+        # Decode-ahead ring filled by a dedicated decoder thread
+        self.PREFETCH_FRAMES = 3  # Decoded frames buffered ahead of presentation
+        self.MAX_DROPPED_FRAMES = 2  # Late frames skipped in a row before one is shown anyway
+        self.FORWARD_DECODE_WINDOW = 0.5  # Seconds decoded forward instead of seeking while no keyframe index exists
+        self.CATCH_UP_SEEK_LAG = 0.5  # Seconds behind the clock past which playback seeks to catch up
+        self._frame_queue = deque()
+        self._queue_cond = threading.Condition()
+        self._decode_from = None  # Pending decoder reposition time in seconds
+        self._decode_generation = 0  # Bumped on every reposition to discard stale frames
+        self._decoder_thread = None
+        self._container_lock = threading.Lock()  # Serializes container access across threads
+        # Decoder position, used to serve forward seeks inside the current GOP without seeking
+        self._keyframe_times = None  # Sorted keyframe times, filled in by a helper thread
+        self._keyframe_pts = None  # Keyframe pts in stream time base, parallel to _keyframe_times
+        self._decoded_until = None  # Time of the last frame out of the decoder, None after a seek
+        self._skip_before = 0  # Frames before this time are decoded but not converted
+        self._dropped_run = 0  # Late frames skipped in a row
         
         # Audio player process
         self.audio_process = None
+        self._audio_backend = FFPLAY_PATH
+        self._pactl = PACTL_PATH
+        self._pulseaudio = PULSEAUDIO_PATH
         self.audio_process_start_time = 0
+        self._audio_suspended = False  # Audio process group is SIGSTOPped by pause()
+        self._audio_suspended_at = 0
         self._pause_position = 0
+        # Latest audio position reported by ffplay: (process, seconds, monotonic time)
+        self._audio_clock = None
+        self.AV_SYNC_TOLERANCE = 0.045  # Audio/video lag tolerated before the video clock is corrected
+        self.AV_SYNC_MAX_CORRECTION = 1.0  # Larger lags mean the clocks disagree on the origin; leave them
+        self.AUDIO_CLOCK_MAX_AGE = 0.5  # Seconds after which an audio clock report is too old to trust
         
         # Seeking
         self.seek_requested = False
         self.seek_target = 0  # Target frame number
         self.seek_timestamp = 0  # Target timestamp in seconds
+        self.SCRUB_SNAP_DISTANCE = 1.0  # Seconds a scrubbing seek may move to reach a keyframe
+        self._show_next_decoded = False  # A seek while not playing waits for its target frame
+        # Audio restarts after a seek are coalesced while the user keeps seeking
+        self.AUDIO_SEEK_DEBOUNCE = 0.08  # Seconds without a newer seek before ffplay restarts
+        self._audio_resume_at = 0  # Monotonic deadline for the pending audio restart, 0 if none
+        # Recently presented frames by frame number, so seeking back shows the target at once
+        self.FRAME_CACHE_BYTES = 32 * 1024 * 1024
+        self._frame_cache = OrderedDict()  # (frame number, shape) -> frame, LRU first; touched by run() only
+        self._frame_cache_bytes = 0
         
         # For debugging
         self.last_frame_time = 0
         self.frame_count = 0
 
+    @property
+    def playing(self):
+        return self._state == STATE_PLAYING
+    
+    @property
+    def paused(self):
+        return self._state == STATE_PAUSED
+    
+    @property
+    def stopped(self):
+        return self._state == STATE_STOPPED
+    
     def load_video(self, file_path):
         """Load video file using PyAV"""
         try:
@@ -61,7 +209,19 @@ class VideoPlayerThread(QThread):
                 self._cleanup_resources()
                 
                 # Open video file
-                self.container = av.open(file_path)
+                self.container = None
+                if self.hwaccel is not None:
+                    try:
+                        self.container = av.open(file_path, hwaccel=self.hwaccel)
+                    except Exception as e:
+                        hwaccel_error = e
+                if self.container is None:
+                    self.container = av.open(file_path)
+                    if self.hwaccel is not None:
+                        # The file opens in software, so the device itself is unusable
+                        error(f"Hardware decoding unavailable, using software: {hwaccel_error}")
+                        _failed_hwaccel_types.add(self._hwaccel_type)
+                        self.hwaccel = None
                 if not self.container:
                     error(f"Failed to open video file: {file_path}")
                     return False
@@ -79,36 +239,57 @@ class VideoPlayerThread(QThread):
                 
                 self.current_file = file_path
                 
-                # Get video properties
-                self.video_fps = float(self.video_stream.average_rate) if self.video_stream.average_rate else 30
+                # Get video properties; PyAV reports rates as exact Fractions (30000/1001 for NTSC)
+                average_rate = self.video_stream.average_rate
+                self._fps_fraction = Fraction(average_rate) if average_rate and average_rate > 0 else Fraction(30)
+                self.video_fps = float(self._fps_fraction)
+                self._frame_interval = float(1 / self._fps_fraction)
                 
-                # Get duration
+                # Get duration, kept exact for the frame count below
                 if self.video_stream.duration:
-                    time_base = float(self.video_stream.time_base)
-                    self.video_duration = self.video_stream.duration * time_base
+                    duration = self.video_stream.duration * Fraction(self.video_stream.time_base)
                 elif self.container.duration:
-                    self.video_duration = self.container.duration / av.time_base
+                    duration = Fraction(self.container.duration, av.time_base)
                 else:
                     # Estimate from frames if available
-                    self.video_duration = 0
+                    duration = Fraction(0)
+                self.video_duration = float(duration)
                 
-                # Estimate total frames
-                if self.video_fps > 0 and self.video_duration > 0:
-                    self.total_frames = int(self.video_duration * self.video_fps)
+                # Estimate total frames without float truncation (29.97 fps * 10.01 s is 300, not 299)
+                if self.video_stream.frames:
+                    self.total_frames = self.video_stream.frames
                 else:
-                    self.total_frames = 0
+                    self.total_frames = round(duration * self._fps_fraction)
                 
                 # Get frame dimensions
                 self.video_width = self.video_stream.width
                 self.video_height = self.video_stream.height
                 
-                # Get codec context
-                self.codec_context = self.video_stream.codec_context
+                # Software decoding uses slice and frame threads across all cores; set before
+                # the first decode opens the context (also the fallback for hardware decoders)
+                if not self.video_stream.codec_context.is_hwaccel:
+                    self.video_stream.codec_context.thread_type = 'AUTO'
+                    self.video_stream.codec_context.thread_count = 0
+                
+                # Get codec context, preferring a hardware decoder
+                self.codec_context = self._open_decoder(self.video_stream)
+                
+                # Start reading the file into the page cache so seeks don't wait on the disk
+                self._prefetch_file(file_path)
+                
+                # Index keyframes off the UI thread; seeks fall back to container.seek until ready
+                self._keyframe_times = None
+                self._keyframe_pts = None
+                cached_index = _keyframe_index_cache.get(self._index_key(file_path))
+                if cached_index:
+                    self._keyframe_pts, self._keyframe_times = cached_index
+                else:
+                    threading.Thread(target=self._index_keyframes, args=(file_path,), daemon=True).start()
+                self._frame_cache.clear()
+                self._frame_cache_bytes = 0
                 
                 # Reset state
-                self.playing = False
-                self.paused = False
-                self.stopped = True
+                self._state = STATE_STOPPED
                 self.current_frame = 0
                 self._pause_position = 0
                 self.play_start_time = 0
@@ -131,7 +312,10 @@ class VideoPlayerThread(QThread):
                 'height': self.video_height,
                 'fps': self.video_fps,
                 'total_frames': self.total_frames,
-                'duration': self.video_duration
+                'duration': self.video_duration,
+                # e.g. "h264 (vaapi)", "h264_v4l2m2m" or plain "h264" for software
+                'decoder': (f"{self.codec_context.name} ({self._hwaccel_type})"
+                            if self.codec_context.is_hwaccel else self.codec_context.name)
             }
             
             self.video_info_ready.emit(video_info)
@@ -141,70 +325,172 @@ class VideoPlayerThread(QThread):
             error(f"Failed to load video with PyAV: {e}")
             return False
     
+    def load_video_async(self, file_path):
+        """Open file_path on the player thread; load_finished reports the result"""
+        self._load_request = file_path
+        self._wake.set()
+    
     def _cleanup_resources(self):
         """Clean up all video resources"""
         try:
-            # Stop audio
-            self._stop_audio_process()
+            # Stop audio (shutdown has already stopped it gracefully)
+            self._stop_audio_process(graceful=False)
             
-            # Close container
-            if self.container:
-                try:
-                    self.container.close()
-                except Exception as e:
-                    error(f"Error closing container: {e}")
-                finally:
-                    self.container = None
-                    self.video_stream = None
-                    self.codec_context = None
+            # Close container (waits for an in-flight decode to finish)
+            with self._container_lock:
+                if self.container:
+                    try:
+                        self.container.close()
+                    except Exception as e:
+                        error(f"Error closing container: {e}")
+                    finally:
+                        self.container = None
+                        self.video_stream = None
+                        self.codec_context = None
+                # The index stays in _keyframe_index_cache for the next player
+                self._keyframe_times = None
+                self._keyframe_pts = None
                     
         except Exception as e:
             error(f"Error in cleanup: {e}")
     
-    def _stop_audio_process(self):
+    def _audio_running(self):
+        """Check whether the audio process is still alive"""
+        return self.audio_process is not None and self.audio_process.poll() is None
+    
+    def _stop_audio_process(self, graceful=True):
         """Safely stop audio process"""
         if self.audio_process:
             try:
                 if self.audio_process.poll() is None:
-                    os.killpg(os.getpgid(self.audio_process.pid), signal.SIGTERM)
+                    # A stopped process would not act on SIGTERM until continued
+                    if not graceful or self._audio_suspended:
+                        # Fast path: ffplay holds no state worth flushing, and it leads
+                        # its own session (start_new_session) so pid is the group id
+                        os.killpg(self.audio_process.pid, signal.SIGKILL)
+                        _reap_later(self.audio_process)
+                        return
+                    os.killpg(self.audio_process.pid, signal.SIGTERM)
                     try:
-                        self.audio_process.wait(timeout=2)  # Increase timeout period
+                        # ffplay exits on SIGTERM within a few ms; don't stall shutdown for seconds
+                        self.audio_process.wait(timeout=0.1)
                     except subprocess.TimeoutExpired:
-                        os.killpg(os.getpgid(self.audio_process.pid), signal.SIGKILL)
+                        os.killpg(self.audio_process.pid, signal.SIGKILL)
+                        _reap_later(self.audio_process)
                     #debug("Audio process terminated")
             except Exception as e:
                 error(f"Error stopping audio process: {e}")
             finally:
                 self.audio_process = None
+                self._audio_suspended = False
     
-    def _check_audio_device_status(self):
-        """Check if audio devices are available"""
+    def _suspend_audio(self):
+        """Freeze the audio process group in place instead of killing it"""
+        if self._audio_suspended or not self._audio_running():
+            return
         try:
-            result = subprocess.run(['pactl', 'list', 'sinks'], 
-                                    stdout=subprocess.DEVNULL, 
-                                    stderr=subprocess.DEVNULL, 
-                                    timeout=2)
-            return result.returncode == 0
-        except:
+            os.killpg(self.audio_process.pid, signal.SIGSTOP)
+            self._audio_suspended = True
+            self._audio_suspended_at = time.monotonic()
+        except Exception as e:
+            error(f"Error suspending audio process: {e}")
+            self._stop_audio_process(graceful=False)
+    
+    def _resume_audio(self):
+        """Continue a suspended audio process; returns False if audio must be restarted"""
+        if not self._audio_suspended:
+            return False
+        self._audio_suspended = False
+        if not self._audio_running():
+            return False
+        try:
+            os.killpg(self.audio_process.pid, signal.SIGCONT)
+            self.audio_process_start_time += time.monotonic() - self._audio_suspended_at
+            # The last report predates the pause; wait for a fresh one
+            self._audio_clock = None
+            return True
+        except Exception as e:
+            error(f"Error resuming audio process: {e}")
+            self._stop_audio_process(graceful=False)
+            return False
+    
+    def _read_audio_clock(self, process):
+        """Track the audio position from ffplay's status line (one thread per audio process)"""
+        pending = b''
+        try:
+            fd = process.stderr.fileno()
+            while True:
+                chunk = os.read(fd, 4096)
+                if not chunk:
+                    break
+                # Status lines end in '\r'; keep a partial line for the next read
+                lines, _, pending = (pending + chunk).rpartition(b'\r')
+                matches = FFPLAY_CLOCK_RE.findall(lines)
+                if matches:
+                    self._audio_clock = (process, float(matches[-1]), time.monotonic())
+        except Exception as e:
+            error(f"Error reading audio clock: {e}")
+        finally:
+            process.stderr.close()
+    
+    def _sync_to_audio(self):
+        """Steer the playback clock onto the audio clock (caller holds _lock)"""
+        sample = self._audio_clock
+        if sample is None or sample[0] is not self.audio_process or self._audio_suspended:
+            return
+        _, audio_time, sampled_at = sample
+        now = time.monotonic()
+        if now - sampled_at > self.AUDIO_CLOCK_MAX_AGE:
+            return
+        lag = self._playback_clock() - (audio_time + now - sampled_at)
+        if self.AV_SYNC_TOLERANCE < abs(lag) < self.AV_SYNC_MAX_CORRECTION:
+            # Video ahead: the next frame waits longer; behind: late frames get dropped
+            self.play_start_time += lag
+    
+    def _check_audio_device_status(self):
+        """Check if audio devices are available, reusing a recent probe"""
+        # Module level so the player threads main.py creates per video share it
+        global _audio_device_status
+        now = time.monotonic()
+        if _audio_device_status is not None and now - _audio_device_status[0] < AUDIO_DEVICE_TTL:
+            return _audio_device_status[1]
+        available = self._probe_audio_device()
+        _audio_device_status = (now, available)
+        return available
+    
+    def _probe_audio_device(self):
+        """Ask PulseAudio whether an output device is available"""
+        if self._pactl:
+            try:
+                result = subprocess.run([self._pactl, 'list', 'sinks'], 
+                                        stdout=subprocess.DEVNULL, 
+                                        stderr=subprocess.DEVNULL, 
+                                        timeout=2)
+                return result.returncode == 0
+            except Exception as e:
+                error(f"Error querying audio sinks: {e}")
+        if self._pulseaudio:
             try:
-                result = subprocess.run(['pulseaudio', '--check'], 
+                result = subprocess.run([self._pulseaudio, '--check'], 
                                         stdout=subprocess.DEVNULL, 
                                         stderr=subprocess.DEVNULL)
                 return result.returncode == 0
-            except:
-                return False
+            except Exception as e:
+                error(f"Error checking pulseaudio: {e}")
+        return False
     
     def _get_current_volume(self):
         """Get current system volume percentage"""
         try:
-            result = subprocess.run(['pactl', 'get-sink-volume', '@DEFAULT_SINK@'], 
+            if not self._pactl:
+                return 100
+            result = subprocess.run([self._pactl, 'get-sink-volume', '@DEFAULT_SINK@'], 
                                     stdout=subprocess.PIPE, 
                                     stderr=subprocess.DEVNULL, 
                                     text=True, 
                                     timeout=1)
             if result.returncode == 0:
-                import re
-                match = re.search(r'(\d+)%', result.stdout)
+                match = VOLUME_RE.search(result.stdout)
                 if match:
                     return int(match.group(1))
         except Exception as e:
@@ -213,7 +499,8 @@ class VideoPlayerThread(QThread):
     
     def _start_audio(self, start_time=0):
         """Start audio playback"""
-        if not self.container:
+        self._audio_resume_at = 0  # Any pending post-seek restart is served by this call
+        if not self.container or not self._audio_backend:
             return
             
         # Check audio device
@@ -223,31 +510,196 @@ class VideoPlayerThread(QThread):
             
         try:
             # Stop existing audio
-            self._stop_audio_process()
+            self._stop_audio_process(graceful=False)
             
             # Use ffplay for audio (more reliable than paplay)
             cmd = [
-                'ffplay',
+                self._audio_backend,
                 '-nodisp',  # No video display
+                '-vn', '-sn',  # Decode the audio stream only
                 '-autoexit',  # Exit when audio ends
                 '-loglevel', 'quiet',  # Suppress output
+                '-stats',  # ...except the status line, which reports the audio clock
+                # Low-latency input: skip long stream probing before the first sample
+                '-fflags', 'nobuffer',
+                '-probesize', '32768',
+                '-analyzeduration', '0',
                 '-ss', str(start_time),  # Start position
                 '-i', self.current_file
             ]
             
             self.audio_process = subprocess.Popen(
                 cmd,
+                stdin=subprocess.DEVNULL,
                 stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-                preexec_fn=os.setsid
+                stderr=subprocess.PIPE,
+                start_new_session=True  # setsid() in the child without a Python preexec_fn
             )
+            # Drain the status line so ffplay never blocks on a full pipe
+            threading.Thread(target=self._read_audio_clock, args=(self.audio_process,),
+                             daemon=True).start()
             
-            self.audio_process_start_time = time.time()
+            self.audio_process_start_time = time.monotonic()
             #debug(f"Started audio playback at {start_time:.2f}s")
             
         except Exception as e:
             error(f"Failed to start audio: {e}")
     
+    def set_display_size(self, width, height):
+        """Set the size decoded frames are scaled down to before being emitted"""
+        # A single tuple assignment is atomic; the decoder reads it without the lock
+        self._display_size = (width, height)
+    
+    def _output_size(self):
+        """Frame size fitted inside the display size, or (None, None) for source size"""
+        display_size = self._display_size
+        if display_size is None or self.video_width <= 0 or self.video_height <= 0:
+            return None, None
+        
+        # Keep the aspect ratio and never upscale
+        scale = min(display_size[0] / self.video_width, display_size[1] / self.video_height)
+        if scale >= 1 or scale <= 0:
+            return None, None
+        return max(1, round(self.video_width * scale)), max(1, round(self.video_height * scale))
+    
+    def _make_hwaccel(self):
+        """Pick the first hwaccel device type FFmpeg supports, or None for software decoding"""
+        try:
+            available = hwdevices_available()
+        except Exception as e:
+            error(f"Failed to query hardware devices: {e}")
+            return None
+        for device_type in HWACCEL_DEVICE_TYPES:
+            if device_type in available and device_type not in _failed_hwaccel_types:
+                # Streams the device can't decode fall back to the software decoder
+                self._hwaccel_type = device_type
+                return HWAccel(device_type=device_type, allow_software_fallback=True)
+        return None
+    
+    def _to_bgr(self, frame):
+        """Let swscale emit BGR at display size for OpenCV/Qt directly"""
+        width, height = self._output_size()
+        # frame.to_ndarray(format=...) would build a new swscale context for every frame
+        bgr = self._reformatter.reformat(frame, format='bgr24', width=width, height=height,
+                                         **_reformat_options)
+        return bgr.to_ndarray()
+    
+    def _open_decoder(self, stream):
+        """Open a hardware decoder for the stream, falling back to its software decoder"""
+        if stream.codec_context.is_hwaccel:
+            # Decoding already runs on the hwaccel device chosen at av.open
+            return stream.codec_context
+        codec_name = stream.codec_context.name
+        decoder_names = [codec_name + suffix for suffix in HW_DECODER_SUFFIXES]
+        if PREFERRED_DECODER and PREFERRED_DECODER in av.codecs_available:
+            decoder_names.insert(0, PREFERRED_DECODER)
+        for decoder_name in decoder_names:
+            if decoder_name not in av.codecs_available or decoder_name in _failed_decoders:
+                continue
+            if decoder_name == PREFERRED_DECODER:
+                try:
+                    # The override is global; skip it for videos in another format
+                    if av.Codec(decoder_name, 'r').id != stream.codec_context.codec.id:
+                        continue
+                except Exception as e:
+                    error(f"Preferred decoder {decoder_name} unusable: {e}")
+                    continue
+            try:
+                codec_context = av.CodecContext.create(decoder_name, 'r')
+                codec_context.extradata = stream.codec_context.extradata
+                codec_context.open()
+                #debug(f"Using hardware decoder {decoder_name}")
+                return codec_context
+            except Exception as e:
+                # Expected on machines without the device; the software decoder takes over
+                _failed_decoders.add(decoder_name)
+                debug(f"Hardware decoder {decoder_name} unavailable: {e}")
+        return stream.codec_context
+    
+    def _prefetch_file(self, file_path):
+        """Ask the kernel to read the whole file ahead in the background"""
+        if not hasattr(os, 'posix_fadvise'):
+            return
+        try:
+            fd = os.open(file_path, os.O_RDONLY)
+            try:
+                # A file larger than free memory would only evict its own pages again
+                free_bytes = os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+                if os.fstat(fd).st_size < free_bytes:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+        except (OSError, ValueError) as e:
+            error(f"Failed to prefetch {file_path}: {e}")
+    
+    def _index_key(self, file_path):
+        """Identify a file version for the keyframe index cache"""
+        try:
+            st = os.stat(file_path)
+            return (file_path, st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+    
+    def _index_keyframes(self, file_path):
+        """Collect the keyframe positions of the video stream (runs on a helper thread)"""
+        index_key = self._index_key(file_path)
+        try:
+            # A separate container so demuxing here never moves the playback position
+            with av.open(file_path) as container:
+                stream = container.streams.video[0]
+                keyframe_pts = sorted(packet.pts for packet in container.demux(stream)
+                                      if packet.is_keyframe and packet.pts is not None)
+                keyframe_times = [float(pts * stream.time_base) for pts in keyframe_pts]
+        except Exception as e:
+            error(f"Failed to index keyframes: {e}")
+            return
+        if index_key:
+            _keyframe_index_cache[index_key] = (keyframe_pts, keyframe_times)
+        if file_path == self.current_file:
+            # _keyframe_times gates readers, so it is published last
+            self._keyframe_pts = keyframe_pts
+            self._keyframe_times = keyframe_times
+    
+    def _can_decode_forward_to(self, target_time):
+        """True if continuing to decode reaches target_time cheaper than a container seek"""
+        if self._decoded_until is None or target_time <= self._decoded_until:
+            return False
+        keyframe_times = self._keyframe_times
+        if keyframe_times is None:
+            # No index yet: only short hops, where a seek could not land much closer
+            return target_time - self._decoded_until <= self.FORWARD_DECODE_WINDOW
+        # A seek would land on the last keyframe <= target_time; if that is behind the
+        # decoder, continuing to decode is strictly less work
+        return (bisect.bisect_right(keyframe_times, self._decoded_until) ==
+                bisect.bisect_right(keyframe_times, target_time))
+    
+    def _keyframe_between(self, start_time, end_time):
+        """True if the keyframe index has a keyframe after start_time and at or before end_time"""
+        keyframe_times = self._keyframe_times
+        if not keyframe_times:
+            return False
+        return (bisect.bisect_right(keyframe_times, start_time) <
+                bisect.bisect_right(keyframe_times, end_time))
+    
+    def _seek_container(self, target_time):
+        """Seek the container and reset the decoder"""
+        self._decoded_until = None
+        keyframe_times = self._keyframe_times
+        index = bisect.bisect_right(keyframe_times, target_time) - 1 if keyframe_times else -1
+        if index >= 0:
+            # Land exactly on the indexed keyframe instead of trusting the demuxer's own lookup
+            self.container.seek(self._keyframe_pts[index], stream=self.video_stream)
+        else:
+            self.container.seek(int(target_time * 1000000))
+        # container.seek only flushes the stream's own codec context
+        if self.codec_context is not self.video_stream.codec_context:
+            self.codec_context.flush_buffers()
+    
+    def _decode_video(self):
+        """Demux video packets and decode them with the selected decoder (generator)"""
+        for packet in self.container.demux(self.video_stream):
+            yield from self.codec_context.decode(packet)
+    
     def _get_frame_at_time(self, target_time):
         """Get frame at specific time with error handling"""
         if not self.container or not self.video_stream:
@@ -255,68 +707,192 @@ class VideoPlayerThread(QThread):
             
         try:
             # Seek to the target time
-            self.container.seek(int(target_time * 1000000))
+            self._seek_container(target_time)
             
             # Decode frames until we reach target time
-            for packet in self.container.demux(video=0):
-                for frame in packet.decode():
-                    if frame.pts is not None:
-                        frame_time = frame.pts * self.video_stream.time_base
-                        if float(frame_time) >= target_time:
-                            # Convert to numpy array
-                            rgb_frame = frame.to_ndarray(format='rgb24')
-                            # Convert RGB to BGR for OpenCV
-                            bgr_frame = rgb_frame[:, :, ::-1]
-                            return bgr_frame
+            for frame in self._decode_video():
+                if frame.pts is not None and frame.time >= target_time:
+                    return self._to_bgr(frame)
             
         except Exception as e:
             error(f"Error getting frame at time {target_time}: {e}")
             
         return None
     
-    def _get_next_frame_sequence(self):
+    def get_preview_frame(self):
+        """Decode the first frame of the loaded video for display before playback starts"""
+        with self._container_lock:
+            return self._get_frame_at_time(0)
+    
+    def _cache_key(self, frame_number):
+        """Frame cache key; frames are stored at the size they were scaled to for display"""
+        width, height = self._output_size()
+        if width is None:
+            width, height = self.video_width, self.video_height
+        return frame_number, (height, width)
+    
+    def _cache_frame(self, frame_number, frame):
+        """Remember a presented frame, evicting the least recently used past the byte budget"""
+        # Emitted frames are never written to again, so the cache keeps references, not copies
+        cache_key = (frame_number, frame.shape[:2])
+        if cache_key in self._frame_cache:
+            self._frame_cache.move_to_end(cache_key)
+            return
+        self._frame_cache[cache_key] = frame
+        self._frame_cache_bytes += frame.nbytes
+        while self._frame_cache_bytes > self.FRAME_CACHE_BYTES:
+            _, evicted = self._frame_cache.popitem(last=False)
+            self._frame_cache_bytes -= evicted.nbytes
+    
+    def _post_frame(self, frame):
+        """Hand a frame to the GUI thread, replacing one it has not picked up yet"""
+        with self._frame_lock:
+            self._latest_frame = frame
+            if self._frame_pending:
+                return
+            self._frame_pending = True
+        self._frame_posted.emit()
+    
+    def _deliver_frame(self):
+        """Emit the newest posted frame through frame_ready (runs on the GUI thread)"""
+        with self._frame_lock:
+            self._frame_pending = False
+            frame, self._latest_frame = self._latest_frame, None
+        if frame is not None:
+            self.frame_ready.emit(frame)
+    
+    def _playback_clock(self):
+        """Current media time in seconds while playing; hold _lock for a consistent read"""
+        return time.monotonic() - self.play_start_time - self.accumulated_pause_time
+    
+    def _retarget_decoder(self, start_time):
+        """Make the running frame sequence resume output at start_time"""
+        # Frames decoded from the keyframe before start_time are not converted
+        self._skip_before = start_time - self._frame_interval / 2
+        self._dropped_run = self.MAX_DROPPED_FRAMES  # The first frame after a reposition is always shown
+    
+    def _get_next_frame_sequence(self, start_time=0):
         """Get the next frame in sequence (generator)"""
         if not self.container or not self.video_stream:
             return
+        
+        self._retarget_decoder(start_time)
             
         try:
-            for packet in self.container.demux(video=0):
-                if packet.stream.type != 'video':
+            # Decode the video stream sequentially; other streams are skipped by the demuxer
+            for frame in self._decode_video():
+                if frame.pts is None:
                     continue
+                self._decoded_until = frame.time
+                if frame.time >= self._skip_before:
+                    # Don't convert frames the clock has already passed (unlocked read,
+                    # a stale value only misjudges one frame)
+                    if (self._state == STATE_PLAYING and self._dropped_run < self.MAX_DROPPED_FRAMES and
+                            frame.time < self._playback_clock() - self._frame_interval):
+                        self._dropped_run += 1
+                        continue
+                    self._dropped_run = 0
                     
-                for frame in packet.decode():
-                    if frame.pts is not None:
-                        # Convert to numpy array
-                        rgb_frame = frame.to_ndarray(format='rgb24')
-                        # Convert RGB to BGR for OpenCV
-                        bgr_frame = rgb_frame[:, :, ::-1]
-                        
-                        # Calculate frame time
-                        frame_time = frame.pts * self.video_stream.time_base
-                        
-                        yield bgr_frame, float(frame_time)
+                    bgr_frame = self._to_bgr(frame)
+                    
+                    start_time = frame.time
+                    yield bgr_frame, frame.time
                         
         except Exception as e:
-            error(f"Error in frame sequence: {e}")
+            if self.codec_context is self.video_stream.codec_context:
+                error(f"Error in frame sequence: {e}")
+                return
+            # Hardware decoding failed mid-stream; continue in software from the same spot
+            error(f"Hardware decoder {self.codec_context.name} failed, using software: {e}")
+            self.codec_context = self.video_stream.codec_context
+            self._seek_container(start_time)
+            yield from self._get_next_frame_sequence(start_time + self._frame_interval)
+    
+    def _restart_decoder(self, start_time):
+        """Drop buffered frames and make the decoder thread continue from start_time"""
+        with self._queue_cond:
+            self._frame_queue.clear()
+            self._decode_generation += 1
+            self._decode_from = start_time
+            self._queue_cond.notify_all()
+    
+    def _decoder_loop(self):
+        """Decode frames ahead of presentation into the bounded frame queue"""
+        frame_generator = None
+        
+        while not self.exiting:
+            with self._queue_cond:
+                # Sleep while the ring is full or there is nothing to decode
+                while (not self.exiting and self._decode_from is None and
+                       (frame_generator is None or
+                        len(self._frame_queue) >= self.PREFETCH_FRAMES)):
+                    self._queue_cond.wait(0.5)
+                if self.exiting:
+                    break
+                decode_from = self._decode_from
+                self._decode_from = None
+                generation = self._decode_generation
+            
+            with self._container_lock:
+                if not self.container or not self.video_stream:
+                    frame_generator = None
+                    continue
+                
+                if decode_from is not None and frame_generator is not None and \
+                        self._can_decode_forward_to(decode_from):
+                    # Short forward seek: keep decoding, skipping frames before the target
+                    self._retarget_decoder(decode_from)
+                elif decode_from is not None:
+                    try:
+                        self._seek_container(decode_from)
+                        frame_generator = self._get_next_frame_sequence(decode_from)
+                    except Exception as e:
+                        error(f"Error initializing frame generator: {e}")
+                        frame_generator = None
+                        continue
+                
+                try:
+                    frame, frame_time = next(frame_generator)
+                except StopIteration:
+                    # End of stream marker for the presentation loop
+                    frame, frame_time = None, None
+                    frame_generator = None
+                    self._decoded_until = None
+            
+            with self._queue_cond:
+                # A reposition while decoding makes this frame stale
+                if generation == self._decode_generation:
+                    self._frame_queue.append((frame, frame_time))
+                    self._queue_cond.notify_all()
     
     def play(self):
         """Start playback"""
         with self._lock:
-            if self.stopped:
+            state = self._state
+            if state == STATE_STOPPED:
                 # Starting from beginning or paused position
-                self.play_start_time = time.time() - self._pause_position
+                self.play_start_time = time.monotonic() - self._pause_position
                 self.base_timestamp = self._pause_position
-            elif self.paused:
+            elif state == STATE_PAUSED:
                 # Resuming from pause
-                self.accumulated_pause_time += (time.time() - self.last_pause_start)
-                self.play_start_time = time.time() - self.base_timestamp - self.accumulated_pause_time
+                self.accumulated_pause_time += (time.monotonic() - self.last_pause_start)
+                self.play_start_time = time.monotonic() - self.base_timestamp - self.accumulated_pause_time
             
-            self.playing = True
-            self.paused = False
-            self.stopped = False
+            if state == STATE_STOPPED:
+                # Decode ahead from the new start position; a seek made while stopped already
+                # moved base_timestamp there, so run() must not reposition the decoder again
+                self.seek_requested = False
+                self._restart_decoder(self.base_timestamp)
             
-            # Start audio if available
-            if self.container:
+            self._state = STATE_PLAYING
+            self._show_next_decoded = False  # The playback loop presents the target now
+            self._wake.set()
+            
+            # Start audio if available; a repeated play keeps the running process and
+            # resuming from pause continues the suspended one
+            audio_alive = ((state == STATE_PLAYING and self._audio_running()) or
+                           (state == STATE_PAUSED and self._resume_audio()))
+            if self.container and not audio_alive:
                 has_audio = any(stream.type == 'audio' for stream in self.container.streams)
                 if has_audio:
                     self._start_audio(self.base_timestamp)
@@ -326,9 +902,9 @@ class VideoPlayerThread(QThread):
     def pause(self):
         """Pause playback"""
         with self._lock:
-            if self.playing and not self.stopped:
+            if self._state == STATE_PLAYING:
                 # Calculate current position
-                current_time = time.time()
+                current_time = time.monotonic()
                 elapsed = current_time - self.play_start_time - self.accumulated_pause_time
                 self.base_timestamp = max(0, min(elapsed, self.video_duration))
                 
@@ -336,19 +912,19 @@ class VideoPlayerThread(QThread):
                 self._pause_position = self.base_timestamp
                 self.last_pause_start = current_time
                 
-                # Stop audio
-                self._stop_audio_process()
+                # Freeze audio where it is; play() continues it without re-probing the file
+                self._audio_resume_at = 0
+                self._suspend_audio()
             
-            self.paused = True
-            self.playing = False
+            if self._state != STATE_STOPPED:
+                self._state = STATE_PAUSED
+            self._wake.set()
             #debug(f"Playback paused at position: {self.base_timestamp:.2f}s")
     
     def stop(self):
         """Stop playback"""
         with self._lock:
-            self.playing = False
-            self.paused = False
-            self.stopped = True
+            self._state = STATE_STOPPED
             self.current_frame = 0
             self._pause_position = 0
             self.play_start_time = 0
@@ -356,16 +932,18 @@ class VideoPlayerThread(QThread):
             self.last_pause_start = 0
             self.base_timestamp = 0
             self.frame_count = 0
+            self._audio_resume_at = 0
+            self._wake.set()
             
-            self._stop_audio_process()
+            self._stop_audio_process(graceful=False)
             #debug("Playback stopped")
     
     def get_position(self):
         """Get current playback position (0.0 to 1.0)"""
         with self._lock:
             if self.video_duration > 0:
-                if self.playing:
-                    current_time = time.time()
+                if self._state == STATE_PLAYING:
+                    current_time = time.monotonic()
                     elapsed = current_time - self.play_start_time - self.accumulated_pause_time
                     position = min(elapsed / self.video_duration, 1.0)
                     return position
@@ -373,152 +951,213 @@ class VideoPlayerThread(QThread):
                     return min(self.base_timestamp / self.video_duration, 1.0)
         return 0.0
     
-    def seek(self, frame_number):
-        """Seek to specific frame"""
+    def seek(self, frame_number, exact=True):
+        """Seek to specific frame; exact=False lands on the nearest keyframe, for scrubbing"""
         with self._lock:
             if self.total_frames <= 0:
                 return
                 
             frame_number = max(0, min(frame_number, self.total_frames - 1))
             self.seek_requested = True
-            self.seek_target = frame_number
             
             # Calculate timestamp for seek
-            if self.video_fps > 0:
-                self.seek_timestamp = frame_number / self.video_fps
-            else:
-                self.seek_timestamp = 0
+            self.seek_timestamp = float(frame_number / self._fps_fraction)
+            keyframe_times = self._keyframe_times
+            if not exact and keyframe_times:
+                # Keyframes on either side of the target; the decoder starts at one without
+                # decoding the rest of the GOP
+                index = bisect.bisect_right(keyframe_times, self.seek_timestamp)
+                keyframe_time = min(keyframe_times[max(index - 1, 0):index + 1],
+                                    key=lambda t: abs(t - self.seek_timestamp))
+                # With long GOPs the nearest keyframe can be far off; seek exactly then
+                if abs(keyframe_time - self.seek_timestamp) <= self.SCRUB_SNAP_DISTANCE:
+                    self.seek_timestamp = keyframe_time
+                    frame_number = round(self.seek_timestamp * self.video_fps)
+            self.seek_target = frame_number
             
             # Update current position
             self.base_timestamp = self.seek_timestamp
             self.current_frame = frame_number
+            self._wake.set()
             
             # Reset timing
-            if self.playing:
-                self.play_start_time = time.time() - self.seek_timestamp
+            if self._state == STATE_PLAYING:
+                self.play_start_time = time.monotonic() - self.seek_timestamp
                 self.accumulated_pause_time = 0
                 
-                # Restart audio at new position
-                self._stop_audio_process()
-                self._start_audio(self.seek_timestamp)
+                # Silence the old position now; run() restarts audio once seeking settles
+                self._stop_audio_process(graceful=False)
+                self._audio_resume_at = time.monotonic() + self.AUDIO_SEEK_DEBOUNCE
             else:
                 self._pause_position = self.seek_timestamp
+                # Audio frozen at the old position is useless now
+                if self._audio_suspended:
+                    self._stop_audio_process(graceful=False)
             
             #debug(f"Seek to frame {frame_number}, time: {self.seek_timestamp:.2f}s")
     
+    def _apply_seek(self):
+        """Take the pending seek: show the target if it is at hand and reposition the decoder"""
+        with self._lock:
+            self.seek_requested = False
+            seek_timestamp = self.seek_timestamp
+            seek_target = self.seek_target
+        
+        cache_key = self._cache_key(seek_target)
+        cached_frame = self._frame_cache.get(cache_key)
+        if cached_frame is not None:
+            # Show the target now and let the decoder continue from the frame after it
+            self._frame_cache.move_to_end(cache_key)
+            self._post_frame(cached_frame)
+            seek_timestamp += self._frame_interval
+        elif self._state != STATE_PLAYING:
+            # Nothing presents frames while paused or stopped; run() shows the target once decoded
+            self._show_next_decoded = True
+        
+        # Reposition the decoder; the first queued frame is the seek target
+        self._restart_decoder(seek_timestamp)
+    
+    def _show_decoded_seek_target(self):
+        """Post the first frame decoded after a seek while not playing; True once done"""
+        with self._queue_cond:
+            if not self._frame_queue:
+                # Short wait so a newer seek or a state change is picked up quickly
+                self._queue_cond.wait(self._frame_interval)
+            head = self._frame_queue[0] if self._frame_queue else None
+        if head is None:
+            return False
+        frame, frame_time = head
+        if frame is not None:
+            # Left queued: playback presents it again when it resumes from here
+            self._post_frame(frame)
+            self._cache_frame(round(frame_time * self.video_fps), frame)
+        return True
+    
     def run(self):
-        """Main playback loop with precise timing"""
-        frame_generator = None
-        current_frame_time = 0
+        """Main playback loop paced against a monotonic clock"""
+        # Decoding runs ahead on its own thread; this loop only paces and emits
+        self._decoder_thread = threading.Thread(target=self._decoder_loop, daemon=True)
+        self._decoder_thread.start()
         
         while not self.exiting:
-            # Check state
-            with self._lock:
-                playing = self.playing
-                paused = self.paused
-                stopped = self.stopped
-                seek_requested = self.seek_requested
-                seek_timestamp = self.seek_timestamp
-                
-            if stopped or not playing or paused:
-                time.sleep(0.01)
+            # Open a requested file here so probing it never blocks the caller
+            if self._load_request is not None:
+                file_path, self._load_request = self._load_request, None
+                loaded = self.load_video(file_path)
+                if loaded:
+                    # Show the first frame before playback starts
+                    preview_frame = self.get_preview_frame()
+                    if preview_frame is not None:
+                        self._post_frame(preview_frame)
+                self.load_finished.emit(loaded)
+                continue
+            
+            # Check state without taking the lock; a single int read is atomic
+            if self._state != STATE_PLAYING:
+                # Scrubbing a paused or stopped video still shows the target frame
+                if self.seek_requested and self.container:
+                    self._apply_seek()
+                    continue
+                if self._show_next_decoded:
+                    if self._show_decoded_seek_target():
+                        self._show_next_decoded = False
+                    continue
+                # Park until a state change instead of polling
+                self._wake.wait(0.5)
+                self._wake.clear()
                 continue
                 
             if not self.container or not self.video_stream:
-                time.sleep(0.01)
+                self._wake.wait(0.5)
+                self._wake.clear()
                 continue
             
             # Handle seeking
-            if seek_requested:
-                with self._lock:
-                    self.seek_requested = False
-                
-                # Reset generator
-                frame_generator = None
-                
-                # Get frame at seek position
-                frame = self._get_frame_at_time(seek_timestamp)
-                if frame is not None:
-                    self.frame_ready.emit(frame)
-                    self.frame_count += 1
-                
-                # Calculate frame time for synchronization
-                with self._lock:
-                    current_frame_time = self.base_timestamp
-                    self.last_frame_time = time.time()
-                
-                # Continue to normal playback
+            if self.seek_requested:
+                self._apply_seek()
                 continue
             
-            # Initialize frame generator if needed
-            if frame_generator is None:
-                # Seek to current position and start generator
-                try:
-                    self.container.seek(int(current_frame_time * 1000000))
-                    frame_generator = self._get_next_frame_sequence()
-                except Exception as e:
-                    error(f"Error initializing frame generator: {e}")
-                    time.sleep(0.01)
-                    continue
+            # Restart audio once no newer seek arrived within the debounce window
+            if self._audio_resume_at and time.monotonic() >= self._audio_resume_at:
+                with self._lock:
+                    if self._audio_resume_at and self._state == STATE_PLAYING:
+                        self._start_audio(max(0, self._playback_clock()))
             
-            # Calculate target time
-            current_time = time.time()
-            with self._lock:
-                target_time = current_time - self.play_start_time - self.accumulated_pause_time
+            # Look at the oldest decoded frame without taking it yet
+            with self._queue_cond:
+                if not self._frame_queue:
+                    self._queue_cond.wait(self._frame_interval)
+                head = self._frame_queue[0] if self._frame_queue else None
+            if head is None:
+                continue
+            frame, frame_time = head
             
-            # Limit target time to video duration
-            target_time = max(0, min(target_time, self.video_duration))
+            if frame is not None:
+                # Sleep until the frame is due; a state change (e.g. seek) cuts the wait short
+                with self._lock:
+                    self._sync_to_audio()
+                    elapsed = self._playback_clock()
+                delay = frame_time - elapsed
+                if delay > 0:
+                    if self._wake.wait(delay):
+                        self._wake.clear()
+                    continue
+                if -delay > self.CATCH_UP_SEEK_LAG and self._keyframe_between(frame_time, elapsed):
+                    # Far behind with a keyframe in between: seek to the clock instead of
+                    # decoding the backlog frame by frame
+                    self._restart_decoder(elapsed)
+                    continue
             
-            # Check if we need a new frame
-            if target_time > current_frame_time + (1.0 / self.video_fps):
-                try:
-                    # Get next frame from generator
-                    frame, frame_time = next(frame_generator)
-                    
-                    if frame is not None:
-                        # Emit frame
-                        self.frame_ready.emit(frame)
-                        self.frame_count += 1
-                        
-                        # Update current position
-                        with self._lock:
-                            current_frame_time = frame_time
-                            self.current_frame = int(frame_time * self.video_fps)
-                            self.base_timestamp = frame_time
-                        
-                        # Check if we've reached the end
-                        if frame_time >= self.video_duration - (1.0 / self.video_fps):
-                            with self._lock:
-                                self.playing = False
-                                self.stopped = True
-                                self.playback_finished.emit()
-                                self._stop_audio_process()
-                            #debug("Playback finished")
-                            continue
-                
-                except StopIteration:
-                    # End of video
-                    with self._lock:
-                        self.playing = False
-                        self.stopped = True
-                        self.playback_finished.emit()
-                        self._stop_audio_process()
-                    #debug("Playback finished (end of stream)")
+            with self._queue_cond:
+                # The queue may have been flushed by a seek while we waited
+                if not self._frame_queue or self._frame_queue[0] is not head:
                     continue
-                except Exception as e:
-                    error(f"Error getting frame: {e}")
-                    # Reset generator and try again
-                    frame_generator = None
-                    time.sleep(0.01)
+                self._frame_queue.popleft()
+                self._queue_cond.notify_all()
+                # Drop a frame more than one interval late when its successor is due too
+                if (frame is not None and delay < -self._frame_interval and self._frame_queue and
+                        self._frame_queue[0][0] is not None and self._frame_queue[0][1] <= elapsed):
                     continue
             
-            # Sleep to maintain frame rate
-            if self.video_fps > 0:
-                sleep_time = max(0.001, (1.0 / self.video_fps) - 0.005)  # Slightly faster than frame rate
-                time.sleep(sleep_time)
-            else:
-                time.sleep(0.033)
+            if frame is None:
+                # End of video
+                with self._lock:
+                    self._state = STATE_STOPPED
+                    self._stop_audio_process(graceful=False)
+                self.playback_finished.emit()
+                #debug("Playback finished (end of stream)")
+                continue
+            
+            # Emit frame
+            self._post_frame(frame)
+            self.frame_count += 1
+            
+            # Round, not truncate: float PTS times like 29 * 0.04 land just below the frame
+            frame_number = round(frame_time * self.video_fps)
+            self._cache_frame(frame_number, frame)
+            
+            # Update current position
+            with self._lock:
+                self.current_frame = frame_number
+                self.base_timestamp = frame_time
+                self.last_frame_time = time.monotonic()
+            
+            # Check if we've reached the end
+            if frame_time >= self.video_duration - self._frame_interval:
+                with self._lock:
+                    self._state = STATE_STOPPED
+                    self._stop_audio_process(graceful=False)
+                self.playback_finished.emit()
+                #debug("Playback finished")
         
+        # Let the decoder thread observe the exit flag
+        with self._queue_cond:
+            self._queue_cond.notify_all()
+        self._decoder_thread.join(1.0)
+        # A replaced player should not keep decoded or presented frames alive
+        self._frame_queue.clear()
+        self._frame_cache.clear()
+        self._frame_cache_bytes = 0
         #debug("Video player thread exited")
     
     def shutdown(self):
@@ -526,13 +1165,15 @@ class VideoPlayerThread(QThread):
         #debug("Shutting down video player thread")
         with self._lock:
             self.exiting = True
-            self.playing = False
-            self.paused = False
-            self.stopped = True
-            
-            # Ensure thread is stopped before cleaning up
-            self._stop_audio_process()
-            self._cleanup_resources()
-            
-            # Wait briefly to allow operations to finish
-            time.sleep(0.1)
+            self._state = STATE_STOPPED
+            self._wake.set()
+        with self._queue_cond:
+            self._queue_cond.notify_all()
+        
+        # run() cannot restart audio once exiting is set, so the slow graceful
+        # stop and cleanup run without blocking other callers on the lock
+        self._stop_audio_process()
+        self._cleanup_resources()
+        
+        # Wait briefly to allow operations to finish
+        time.sleep(0.1)